@@ -17,7 +17,7 @@ project = argument_project
 repo = argument_repo
 branch = argument_branch
 
-Similarly relations denoted like:
+Similarly relations (and longer callstacks) denoted like:
 
 [local_path_first:line_number_first] -> [local_path_last:line_number_last]: (level) finding
 
@@ -27,12 +27,25 @@ to:
 and:
 {base_url}projects/{project}/repos/{repo}/browse/local_path_last?at=refs%2Fheads%2F{branch}}#{line_number_last}
 
+Positions from column enabled templates (line_number:column) keep the column in the
+displayed text while the link targets the line.
+
 
 
 """
-import datetime as dti
-import pathlib
+from __future__ import annotations
+
+import io
+import itertools
+import os
+import re
+import stat
 import sys
+from collections.abc import Iterable, Iterator
+
+TYPE_CHECKING = False  # The annotations are not evaluated, so typing only has to load for the type checker
+if TYPE_CHECKING:
+    from typing import TextIO
 
 PAGE_PREFIX = """\
 <!DOCTYPE html>
@@ -91,82 +104,204 @@ PAGE_POSTFIX = """\
 """
 
 BASE_URL = 'https://bitbucket.example.com/'
+BUFFER_SIZE = 1 << 16
+JOIN_THRESHOLD = 10_000  # Findings up to which the page is assembled in memory and written at once
+PARALLEL_THRESHOLD = 1 << 23  # Bytes of a report file from which on chunks are mapped in worker processes
 
+# Matches every stripped non-blank line of the report in full:
+# findings populate lpath, lpos, lnum, more, level, and finding - anything else lands in other
+LINE_RE = re.compile(
+    r'\[(?P<lpath>[^:\]]+):(?P<lpos>(?P<lnum>\d+)(?::\d+)?)\]'
+    r'(?P<more>(?:\s*->\s*\[[^:\]]+:\d+(?::\d+)?\])*)'
+    r':\s*\((?P<level>[^)]+)\)\s*(?P<finding>.*)'
+    r'|(?P<other>.*)'
+)
+# Splits the further locations of ranges and callstacks into path, position (line and optional column), and line
+LOCATION_RE = re.compile(r'\[([^:\]]+):((\d+)(?::\d+)?)\]')
 
-def map_findings(stream, project, repo, commit):
-    """Transform the findings (cf. doc string of module)."""
-    job_warnings = []
-    folder_memo = 'NOWHERE_LAND'
-    level_prefix_map = {
-        "error": '<span class="sp-err">',
-        "information": '<span class="sp-info">',
-        "style": '<span class="sp-style">',
-        "performance": '<span class="sp-perf">',
-        "portability": '<span class="sp-port">',
-        "warning": '<span class="sp-warn">',
-        "performance, inconclusive": '<span class="sp-perf-unsure">',
-        "style, inconclusive": '<span class="sp-style-unsure">',
-        "nn": '<span class="sp-nn">',
-    }
+LEVEL_PREFIX_MAP = {
+    "error": '<span class="sp-err">',
+    "information": '<span class="sp-info">',
+    "style": '<span class="sp-style">',
+    "performance": '<span class="sp-perf">',
+    "portability": '<span class="sp-port">',
+    "warning": '<span class="sp-warn">',
+    "performance, inconclusive": '<span class="sp-perf-unsure">',
+    "style, inconclusive": '<span class="sp-style-unsure">',
+    "nn": '<span class="sp-nn">',
+}
+NN_PREFIX = LEVEL_PREFIX_MAP["nn"]
+
+_ESCAPE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'})
+
+
+def _folder_of(path: str) -> str:
+    """Derive the folder part of the forward slash separated path including the trailing slash."""
+    return f'{path.rpartition("/")[0]}/'
+
+
+def _escape(text: str) -> str:
+    """Escape text for HTML content and attribute values, scanning the usual clean text only."""
+    if '&' in text or '<' in text or '>' in text or '"' in text:
+        return text.translate(_ESCAPE)
+    return text
+
+
+def _map_records(
+    stream: Iterable[str], project: str, repo: str, commit: str, job_warnings: list[str], folder_memo: str = 'NOWHERE_LAND'
+) -> Iterator[str]:
+    """Transform the findings in the lines of stream into HTML fragments and collect unparsable lines in job_warnings.
+
+    A stream continuing a report starts from the folder_memo in effect where the report was cut.
+    """
+    prefix_len = len(_escape(folder_memo))
+    url_prefix = _escape(f'{BASE_URL}projects/{project}/repos/{repo}/browse/')
+    at_suffix = _escape(f'?at={commit}#')
+    level_displays: dict[str, str] = {}  # Rendered level spans per level text seen in this report
+    last_path = left_href = left_display = ''
+    # Most records follow single line pattern:
+    # [local_path:line_number]: (level) finding
+    # some denote a range or a longer callstack:
+    # [local_path:line_number_first] -> [local_path:line_number_last]: (level) finding
+    # and with column enabled templates the positions read line_number:column
     for line in stream:
         record = line.strip()
         if not record:
             continue
-        # Most records follow single line pattern:
-        # [local_path:line_number]: (level) finding
-        try:
-            address_part, rest = record.split("]: (", 1)
-        except ValueError:
-            job_warnings.append(record)
-            continue
-        try:
-            local_path, line_number = address_part.lstrip("[").split(":", 1)
-        except ValueError:
-            job_warnings.append(record)
-            continue
-
-        if "[" in line_number:  # We have a range, back off
-            # [local_path:line_number_first] -> [local_path:line_number_last]: (level) finding
-            address_parts, rest = record.split("]: (", 1)
-            # [local_path:line_number_first] -> [local_path:line_number_last
-            left, right = address_parts.lstrip("[").split("] -> [", 1)
-            left_path, left_number = left.split(":", 1)
-            right_path, right_number = right.split(":", 1)
-            if not left_path.startswith(folder_memo):
-                folder_memo = f'{"/".join(pathlib.Path(left_path).parts[:-1])}/'
-                yield f'<h2>{folder_memo}</h2>'
-            left_display = f'{left_path.replace(folder_memo, "")}:{left_number}'
-            right_display = f'{right_path.replace(folder_memo, "")}:{right_number}'
-            try:
-                level, finding = rest.split(") ", 1)
-            except ValueError:
-                job_warnings.append(record)
+        # Plain single location records take the partition fast path (accepting exactly what LINE_RE accepts),
+        # while ranges, callstacks, columns, unusual blanks, and anything else go through LINE_RE
+        address, sep, rest = record.partition(']: (')
+        left_path, _, left_number = address.partition(':')
+        level, close, finding = rest.partition(') ')
+        if (
+            sep and close and left_number.isdecimal() and level and ')' not in level and not finding[:1].isspace()
+            and left_path[:1] == '[' and ']' not in left_path and left_path != '['
+        ):
+            left_path, left_position, more = left_path[1:], left_number, ''
+        else:
+            left_path, left_position, left_number, more, level, finding, other = LINE_RE.fullmatch(record).groups()  # type: ignore[union-attr]
+            if left_path is None:
+                job_warnings.append(other)
                 continue
-            level_display = f'{level_prefix_map.get(level, level_prefix_map["nn"])}{level}</span>'
-            left_url = f'{BASE_URL}projects/{project}/repos/{repo}/browse/{left_path}?at={commit}#{left_number}'
-            right_url = f'{BASE_URL}projects/{project}/repos/{repo}/browse/{right_path}?at={commit}#{right_number}'
-            left_link = f'[<a href="{left_url}" class="no-decor">{left_display}</a>]'
-            right_link = f'[<a href="{right_url}" class="no-decor">{right_display}</a>]'
-            yield f'<p class="finding"><span class="ff-075">{left_link} -&gt; {right_link}: </span>{level_display}<span class="ff-075"> {finding}</span></p>'
-            continue
 
-        if not local_path.startswith(folder_memo):
-            folder_memo = f'{"/".join(pathlib.Path(local_path).parts[:-1])}/'
-            yield f'<h2>{folder_memo}</h2>'
-        path_display = f'{local_path.replace(folder_memo, "")}:{line_number}'
-        try:
-            level, finding = rest.split(") ", 1)
-        except ValueError:
-            job_warnings.append(record)
+        # Paths are escaped as a whole and sliced by the escaped folder memo length,
+        # as the character wise escape keeps the memo a prefix of the escaped path
+        if not left_path.startswith(folder_memo):
+            folder_memo = _folder_of(left_path)
+            folder_html = _escape(folder_memo)
+            prefix_len = len(folder_html)
+            last_path = ''
+            yield f'<h2>{folder_html}</h2>\n'
+
+        if left_path != last_path:  # Consecutive findings mostly share the file, so its link parts are reused
+            last_path, left_html = left_path, _escape(left_path)
+            left_href = f'{url_prefix}{left_html}{at_suffix}'
+            left_display = left_html[prefix_len:] if left_path.startswith(folder_memo) else left_html
+        links = f'[<a href="{left_href}{left_number}" class="no-decor">{left_display}:{left_position}</a>]'
+        if more:  # We have a range or callstack
+            for path, position, number in LOCATION_RE.findall(more):
+                path_html = _escape(path)
+                display = path_html[prefix_len:] if path.startswith(folder_memo) else path_html
+                links = f'{links} -&gt; [<a href="{url_prefix}{path_html}{at_suffix}{number}" class="no-decor">{display}:{position}</a>]'
+        level_display = level_displays.get(level)
+        if level_display is None:
+            level_display = level_displays[level] = f'{LEVEL_PREFIX_MAP.get(level, NN_PREFIX)}{_escape(level)}</span>'
+        if '&' in finding or '<' in finding:  # Inlined _escape - text content only breaks on these two
+            finding_html = finding.translate(_ESCAPE)
+        else:
+            finding_html = finding
+        yield f'<p class="finding"><span class="ff-075">{links}: </span>{level_display}<span class="ff-075"> {finding_html}</span></p>\n'
+
+
+def _job_warnings_section(job_warnings: list[str]) -> str:
+    """Render the lines that were not findings."""
+    nl = '\n'
+    return f'<h2>Warnings from Job Execution</h2><pre>{_escape(nl.join(job_warnings))}</pre>\n'
+
+
+def map_findings(stream: Iterable[str], project: str, repo: str, commit: str) -> Iterator[str]:
+    """Transform the findings (cf. doc string of module) into newline terminated HTML fragments."""
+    job_warnings: list[str] = []
+    yield from _map_records(stream, project, repo, commit, job_warnings)
+    if job_warnings:
+        yield _job_warnings_section(job_warnings)
+
+
+def _chunk_starts(text: str, parts: int) -> list[tuple[int, str]]:
+    """Cut text at lines into up to parts chunks and pair each start with the folder memo in effect there.
+
+    The scan repeats the folder memo refresh of _map_records up to the last cut, so every chunk
+    maps with the same headings and displayed paths as the sequential mapping does.
+    Lines starting with the bracketed memo cannot refresh it (the memo holds no colon or bracket)
+    and skip the match.
+    """
+    folder_memo = 'NOWHERE_LAND'
+    known = f'[{folder_memo}'
+    starts = [(0, folder_memo)]
+    step = len(text) // parts
+    offset = 0
+    for line in io.StringIO(text):
+        if offset >= step * len(starts):
+            starts.append((offset, folder_memo))
+            if len(starts) == parts:
+                break
+        offset += len(line)
+        if line.startswith(known):
             continue
-        level_display = f'{level_prefix_map.get(level, level_prefix_map["nn"])}{level}</span>'
-        the_url = f'{BASE_URL}projects/{project}/repos/{repo}/browse/{local_path}?at={commit}#{line_number}'
-        the_link = f'[<a href="{the_url}" class="no-decor">{path_display}</a>]'
-        yield f'<p class="finding"><span class="ff-075">{the_link}: </span>{level_display}<span class="ff-075"> {finding}</span></p>'
+        record = line.strip()
+        left_path = LINE_RE.fullmatch(record).group('lpath') if record else None  # type: ignore[union-attr]
+        if left_path is not None and not left_path.startswith(folder_memo):
+            folder_memo = _folder_of(left_path)
+            known = f'[{folder_memo}'
+    return starts
 
+
+def _available_cpus() -> int:
+    """Return the number of CPUs this process may run on (honouring affinity masks where the platform tells)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _map_chunk(chunk: str, folder_memo: str, project: str, repo: str, commit: str) -> tuple[str, list[str]]:
+    """Transform one chunk of the report in a worker process."""
+    job_warnings: list[str] = []
+    return ''.join(_map_records(io.StringIO(chunk), project, repo, commit, job_warnings, folder_memo)), job_warnings
+
+
+def map_report_file(fd: int, project: str, repo: str, commit: str, workers: int | None = None) -> Iterator[str]:
+    """Transform the findings of the report file opened as fd using worker processes for the chunks."""
+    with open(fd, encoding='utf-8', closefd=False) as handle:
+        text = handle.read()
+    starts = _chunk_starts(text, workers or _available_cpus())
+    job_warnings: list[str] = []
+    if len(starts) == 1:  # Nothing to share between workers
+        yield from _map_records(io.StringIO(text), project, repo, commit, job_warnings)
+    else:
+        import concurrent.futures  # Only parallel mapping pays for the import
+
+        ends = [begin for begin, _ in starts[1:]] + [len(text)]
+        chunks = [text[begin:end] for (begin, _), end in zip(starts, ends)]
+        memos = [folder_memo for _, folder_memo in starts]
+        n = len(chunks)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=n) as executor:
+            for html, warnings in executor.map(_map_chunk, chunks, memos, [project] * n, [repo] * n, [commit] * n):
+                job_warnings.extend(warnings)
+                yield html
     if job_warnings:
-        nl = "\n"
-        yield f'<h2>Warnings from Job Execution</h2><pre>{nl.join(job_warnings)}</pre>'
+        yield _job_warnings_section(job_warnings)
+
+
+def _large_report_fd(stream: TextIO) -> int | None:
+    """Return the file descriptor if stream is a regular file worth mapping in parallel."""
+    try:
+        fd = stream.fileno()
+        info = os.fstat(fd)
+    except (AttributeError, OSError, ValueError):  # io.UnsupportedOperation is an OSError and a ValueError
+        return None
+    if not stat.S_ISREG(info.st_mode) or info.st_size - os.lseek(fd, 0, os.SEEK_CUR) < PARALLEL_THRESHOLD:
+        return None
+    return fd if _available_cpus() > 1 else None
 
 
 def process(argv=None):
@@ -176,10 +311,44 @@ def process(argv=None):
         print(f"Received ({argv}) argument vector")
         return 2
 
+    import datetime as dti  # Only the page header needs it, not library use of map_findings
+
     project, repo, branch, commit = argv
-    print(PAGE_PREFIX)
-    print(f"<p>Report generated for {project}.{repo}[{branch}].at({commit}) {dti.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} UTC</p>")
-    for finding in map_findings(sys.stdin, project, repo, commit):
-        print(finding)
-    print(PAGE_POSTFIX)
+    sys.stdout.flush()
+    source, sink = sys.stdin, sys.stdout
+    source_layers, sink_layers = [], []  # Own buffers around the standard streams, innermost first
+    try:
+        if hasattr(source, 'buffer'):
+            source_layers.append(io.BufferedReader(source.buffer, BUFFER_SIZE))
+            source = io.TextIOWrapper(source_layers[-1], encoding='utf-8')
+            source_layers.append(source)
+        if hasattr(sink, 'buffer'):
+            sink_layers.append(io.BufferedWriter(sink.buffer, BUFFER_SIZE))
+            sink = io.TextIOWrapper(sink_layers[-1], encoding='utf-8', write_through=False)
+            sink_layers.append(sink)
+        report_fd = _large_report_fd(sys.stdin)
+        if report_fd is None:
+            findings = map_findings(source, project, repo, commit)
+        else:
+            findings = map_report_file(report_fd, project, repo, commit)
+        parts = [
+            f"{PAGE_PREFIX}\n",
+            f"<p>Report generated for {_escape(f'{project}.{repo}[{branch}].at({commit})')} {dti.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} UTC</p>\n",
+            *itertools.islice(findings, JOIN_THRESHOLD),
+        ]
+        if len(parts) - 2 < JOIN_THRESHOLD:  # Small report - one write for the complete page
+            parts.append(f"{PAGE_POSTFIX}\n")
+            sink.write(''.join(parts))
+        else:  # Large report - stream the remaining findings
+            sink.write(''.join(parts))
+            sink.writelines(findings)
+            sink.write(f"{PAGE_POSTFIX}\n")
+    finally:
+        # Detach the own layers outermost first so that collecting them does not close the standard streams.
+        # The reading layers go first as detaching the writing ones flushes and may raise (e.g. on a broken pipe).
+        for layer in reversed(source_layers):
+            layer.detach()
+        for layer in reversed(sink_layers):
+            layer.detach()
+        sys.stdout.flush()
     return 0
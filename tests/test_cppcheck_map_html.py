@@ -1,5 +1,200 @@
 # -*- coding: utf-8 -*-
 # pylint: disable=missing-docstring,unused-import,reimported
+import concurrent.futures
+import contextlib
+import gc
+import io
+import time
+
 import pytest  # type: ignore
 
 import cppcheck_map_html.cppcheck_map_html as cmh
+
+
+def test_map_findings_single_location():
+    stream = io.StringIO('[a/b/c/d.h:42]: (information) The line is short.\n')
+    html = list(cmh.map_findings(stream, 'p', 'r', 'c'))
+    assert html[0] == '<h2>a/b/c/</h2>\n'
+    assert 'browse/a/b/c/d.h?at=c#42' in html[1]
+    assert '>d.h:42</a>' in html[1]
+    assert '<span class="sp-info">information</span>' in html[1]
+
+
+def test_map_findings_range():
+    stream = io.StringIO("[a/b/c/d.h:31] -> [a/b/c/d.cpp:23]: (warning) Different order.\n")
+    html = list(cmh.map_findings(stream, 'p', 'r', 'c'))
+    assert 'browse/a/b/c/d.h?at=c#31' in html[1]
+    assert 'browse/a/b/c/d.cpp?at=c#23' in html[1]
+    assert '>d.h:31</a>] -&gt; [<a' in html[1]
+    assert '<span class="sp-warn">warning</span>' in html[1]
+
+
+def test_map_findings_job_warnings():
+    stream = io.StringIO('\n  \n[d/f.h]: (style) Value of foo is overwritten before use. \n')
+    html = list(cmh.map_findings(stream, 'p', 'r', 'c'))
+    assert html == ['<h2>Warnings from Job Execution</h2><pre>[d/f.h]: (style) Value of foo is overwritten before use.</pre>\n']
+
+
+def test_process_ok(capsys, monkeypatch):
+    report = b'[a/b/c/d.h:42]: (information) The line is short.\n'
+    monkeypatch.setattr('sys.stdin', io.TextIOWrapper(io.BytesIO(report)))
+    assert cmh.process(['p', 'r', 'b', 'c']) == 0
+    out, err = capsys.readouterr()
+    assert out.startswith(cmh.PAGE_PREFIX)
+    assert '<p>Report generated for p.r[b].at(c) ' in out
+    assert '>d.h:42</a>' in out
+    assert out.endswith(f'{cmh.PAGE_POSTFIX}\n')
+
+
+def test_process_streams_large_report(capsys, monkeypatch):
+    report = b'[a/b/c/d.h:42]: (information) The line is short.\n' * 3
+    monkeypatch.setattr('sys.stdin', io.TextIOWrapper(io.BytesIO(report)))
+    monkeypatch.setattr(cmh, 'JOIN_THRESHOLD', 2)
+    assert cmh.process(['p', 'r', 'b', 'c']) == 0
+    out, err = capsys.readouterr()
+    assert out.count('>d.h:42</a>') == 3
+    assert out.endswith(f'{cmh.PAGE_POSTFIX}\n')
+
+
+def test_map_report_file_matches_map_findings(tmp_path):
+    report = ''.join(
+        f'[src/{top}/{sub}d.h:{n}]: (style) Finding {n}.\n' for top in ('a', 'x', 'y') for sub in ('', 'c/', '../') for n in range(5)
+    ) + 'no finding\n'
+    path = tmp_path / 'report.txt'
+    path.write_text(report)
+    assert len(cmh._chunk_starts(report, 4)) == 4
+    for workers in (1, 2, 4):
+        with open(path, 'rb') as handle:
+            parallel = ''.join(cmh.map_report_file(handle.fileno(), 'p', 'r', 'c', workers=workers))
+        assert parallel == ''.join(cmh.map_findings(io.StringIO(report), 'p', 'r', 'c'))
+
+
+def test_map_report_file_single_chunk_stays_in_process(tmp_path, monkeypatch):
+    path = tmp_path / 'report.txt'
+    path.write_text('[a/d.h:1]: (style) Finding.\n')
+    monkeypatch.setattr(concurrent.futures, 'ProcessPoolExecutor', None)
+    with open(path, 'rb') as handle:
+        assert '>d.h:1</a>' in ''.join(cmh.map_report_file(handle.fileno(), 'p', 'r', 'c', workers=1))
+
+
+def test_process_maps_large_report_file_in_parallel(tmp_path, capsys, monkeypatch):
+    report = ''.join(f'[src/{top}/d.h:{n}]: (style) Finding {n}.\n' for top in ('a', 'b', 'c') for n in range(20))
+    path = tmp_path / 'report.txt'
+    path.write_text(report)
+    calls = []
+    map_report_file = cmh.map_report_file
+    monkeypatch.setattr(cmh, 'map_report_file', lambda *args: calls.append(args) or map_report_file(*args))
+    monkeypatch.setattr(cmh, 'PARALLEL_THRESHOLD', 1)
+    monkeypatch.setattr(cmh, '_available_cpus', lambda: 2)
+    with open(path) as stdin:
+        monkeypatch.setattr('sys.stdin', stdin)
+        assert cmh.process(['p', 'r', 'b', 'c']) == 0
+    out, err = capsys.readouterr()
+    assert len(calls) == 1
+    assert ''.join(cmh.map_findings(io.StringIO(report), 'p', 'r', 'c')) in out
+    assert out.endswith(f'{cmh.PAGE_POSTFIX}\n')
+
+
+def test_map_findings_escapes_report_text():
+    stream = io.StringIO('[a/d.h:1]: (style) Compare "a<b" & "b>c".\n<unexpected & odd>\n')
+    html = list(cmh.map_findings(stream, 'p', 'r', 'c'))
+    assert '<span class="ff-075"> Compare &quot;a&lt;b&quot; &amp; &quot;b&gt;c&quot;.</span>' in html[1]
+    assert html[2] == '<h2>Warnings from Job Execution</h2><pre>&lt;unexpected &amp; odd&gt;</pre>\n'
+
+
+def test_map_findings_inner_blanks_stay_linear():
+    def best_time(blanks):
+        report = ''.join(f'[a/d.h:1] -> [a/e.h:2]: (style) x{blanks}y  \nno{blanks}finding  \n' for _ in range(20))
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            html = ''.join(cmh.map_findings(io.StringIO(report), 'p', 'r', 'c'))
+            timings.append(time.perf_counter() - start)
+        assert f'<span class="ff-075"> x{blanks}y</span>' in html
+        assert f'no{blanks}finding\n' in html
+        return min(timings)
+
+    # Eight times the blanks cost about eight times the work when linear and 64 times when quadratic
+    assert best_time(' ' * 160_000) < 24 * best_time(' ' * 20_000)
+
+
+def test_map_findings_callstack_and_columns():
+    stream = io.StringIO('[a/x.h:12:5] -> [a/y.h:3] -> [b/z.cpp:7:1]: (error) Null pointer dereference.\n')
+    html = list(cmh.map_findings(stream, 'p', 'r', 'c'))
+    assert html[0] == '<h2>a/</h2>\n'
+    assert 'browse/a/x.h?at=c#12" class="no-decor">x.h:12:5</a>] -&gt; [<a' in html[1]
+    assert 'browse/a/y.h?at=c#3" class="no-decor">y.h:3</a>] -&gt; [<a' in html[1]
+    assert 'browse/b/z.cpp?at=c#7" class="no-decor">b/z.cpp:7:1</a>]: </span>' in html[1]
+    assert '<span class="sp-err">error</span>' in html[1]
+    assert len(html) == 2
+
+
+def test_map_findings_escapes_level_and_paths():
+    stream = io.StringIO('[a/<img src=x onerror="alert(1)">.h:1] -> [b/&.h:2]: (x<script>) z\n')
+    html = ''.join(cmh.map_findings(stream, 'p', 'r', 'c'))
+    assert '<img' not in html and '<script>' not in html
+    assert 'browse/a/&lt;img src=x onerror=&quot;alert(1)&quot;&gt;.h?at=c#1" class="no-decor">&lt;img' in html
+    assert 'browse/b/&amp;.h?at=c#2" class="no-decor">b/&amp;.h:2</a>]' in html
+    assert '<span class="sp-nn">x&lt;script&gt;</span>' in html
+
+
+def test_map_findings_escaped_folder_prefix_is_stripped():
+    stream = io.StringIO('[a&b/x.h:1]: (style) one\n[a&b/y.h:2]: (style) two\n')
+    html = list(cmh.map_findings(stream, 'p', 'r', 'c'))
+    assert html[0] == '<h2>a&amp;b/</h2>\n'
+    assert 'browse/a&amp;b/y.h?at=c#2" class="no-decor">y.h:2</a>]' in html[2]
+    assert len(html) == 3
+
+
+def test_process_plain_text_streams(monkeypatch):
+    monkeypatch.setattr('sys.stdin', io.StringIO('[a/b/c/d.h:42]: (information) The line is short.\n'))
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        assert cmh.process(['p', 'r', 'b', 'c']) == 0
+    assert '>d.h:42</a>' in out.getvalue()
+    assert out.getvalue().endswith(f'{cmh.PAGE_POSTFIX}\n')
+
+
+class ReadOnlyRaw(io.RawIOBase):
+    def readable(self):
+        return True
+
+
+class BrokenPipeRaw(io.RawIOBase):
+    def writable(self):
+        return True
+
+    def write(self, data):
+        raise BrokenPipeError(32, 'Broken pipe')
+
+
+def test_process_keeps_stdin_open_when_wrapping_stdout_fails(monkeypatch):
+    stdin = io.TextIOWrapper(io.BytesIO(b''))
+    monkeypatch.setattr('sys.stdin', stdin)
+    monkeypatch.setattr('sys.stdout', io.TextIOWrapper(io.BufferedReader(ReadOnlyRaw())))
+    with pytest.raises(io.UnsupportedOperation):
+        cmh.process(['p', 'r', 'b', 'c'])
+    gc.collect()
+    assert not stdin.closed
+    assert not stdin.buffer.closed
+
+
+def test_process_keeps_stdin_open_when_writing_fails(monkeypatch):
+    stdin = io.TextIOWrapper(io.BytesIO(b'[a/b/c/d.h:42]: (information) The line is short.\n'))
+    monkeypatch.setattr('sys.stdin', stdin)
+    monkeypatch.setattr('sys.stdout', io.TextIOWrapper(BrokenPipeRaw()))
+    with pytest.raises(BrokenPipeError):
+        cmh.process(['p', 'r', 'b', 'c'])
+    gc.collect()
+    assert not stdin.closed
+    assert not stdin.buffer.closed
+
+
+def test_map_findings_fast_path_agrees_with_line_re():
+    stream = io.StringIO('[a/x.h:1]: (style)y\n[a/x.h:2]:  (style)  z\n[a/x.h:3]: (a)b) c\n[a]b:4]: (style) w\n[a/x.h:5]: (style) v\n')
+    html = list(cmh.map_findings(stream, 'p', 'r', 'c'))
+    assert '#1" class="no-decor">x.h:1</a>]: </span><span class="sp-style">style</span><span class="ff-075"> y</span>' in html[1]
+    assert '#2" class="no-decor">x.h:2</a>]: </span><span class="sp-style">style</span><span class="ff-075"> z</span>' in html[2]
+    assert '#3" class="no-decor">x.h:3</a>]: </span><span class="sp-nn">a</span><span class="ff-075"> b) c</span>' in html[3]
+    assert '#5" class="no-decor">x.h:5</a>]: </span><span class="sp-style">style</span><span class="ff-075"> v</span>' in html[4]
+    assert html[5] == '<h2>Warnings from Job Execution</h2><pre>[a]b:4]: (style) w</pre>\n'